@@ -0,0 +1,648 @@
+#!/usr/bin/env python3
+"""
+账号收益历史存储
+嵌入式、仅追加的时序存储，记录每个账号 earn/info 的数值采样（soul、core、uptime 等）
+
+存储结构（目录下）：
+- accounts.log        账号ID列表，行号即整数索引（仅追加）
+- head.log            尚未落盘为段文件的采样（NDJSON 预写日志，重启后回放）
+- head.<id>.flushing  正在落盘的预写日志，落盘完成后删除；重启时若仍存在，丢弃该次落盘写出的段并重新回放
+- *.gts               不可变的列式段文件，读取时通过 mmap 映射
+
+段文件布局（本机字节序，各区块按8字节对齐）：
+    头部 | 字段名JSON | 账号索引 uint32[n_accounts] | 行偏移 uint32[n_accounts+1]
+    | 时间戳 uint32[n_rows]（相对 start_ts 的增量） | 每个字段 float64[n_rows]
+    | 全网桶时间 uint32[n_fleet] | 全网桶账号数 uint32[n_fleet] | 每个字段 float64[n_fleet]
+
+行按 (账号, 时间) 排序，单账号查询只需二分定位；旧数据按 DOWNSAMPLE_TIERS 自动降采样，
+同一桶内保留最后一个采样（earn/info 的数值多为累计值）。
+
+全网汇总按 FLEET_STEP 分桶：出现更新的采样后，之前的桶即封存，其汇总随下一次落盘写入原始段；
+尚未封存的桶只在内存中保留每个账号的最后一个采样，查询时不需要扫描原始段的行。
+"""
+
+import bisect
+import json
+import logging
+import math
+import mmap
+import os
+import struct
+import threading
+import time
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+SEGMENT_MAGIC = b'GTS1'
+SEGMENT_VERSION = 1
+SEGMENT_SUFFIX = '.gts'
+# magic, version, reserved, resolution, start_ts, end_ts, n_rows, n_accounts, n_fleet, fields_len
+SEGMENT_HEADER = struct.Struct('<4sHHqqqIIII')
+
+DAY = 86400
+
+# 降采样层级: (窗口结束后多久, 分辨率秒, 段窗口秒)
+# 原始段在所属自然日结束后合并为30分钟精度的日段，7天后降为3小时精度的周段，28天后降为日精度的4周段
+# 各层窗口都按纪元对齐且为上一层窗口的整数倍，保证下层的段完整落在上层的某个窗口内
+DOWNSAMPLE_TIERS: List[Tuple[int, int, int]] = [
+    (0, 1800, DAY),
+    (7 * DAY, 3 * 3600, 7 * DAY),
+    (28 * DAY, DAY, 28 * DAY),
+]
+
+# 全网汇总的最小桶宽
+FLEET_STEP = 3600
+
+# 内存中未落盘采样超过该数量时立即落盘
+MAX_HEAD_ROWS = 50000
+
+NAN = float('nan')
+
+
+def extract_numeric_fields(data: Dict, prefix: str = '') -> Dict[str, float]:
+    """提取 earn/info 返回数据中的数值字段（嵌套字典以点号连接）"""
+    values: Dict[str, float] = {}
+    if not isinstance(data, dict):
+        return values
+    for key, value in data.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, bool):
+            continue
+        if isinstance(value, (int, float)):
+            values[name] = float(value)
+        elif isinstance(value, str):
+            try:
+                values[name] = float(value)
+            except ValueError:
+                continue
+        elif isinstance(value, dict) and not prefix:
+            values.update(extract_numeric_fields(value, f"{name}."))
+    return {k: v for k, v in values.items() if math.isfinite(v)}
+
+
+def _pad8(n: int) -> int:
+    return (n + 7) & ~7
+
+
+class Segment:
+    """只读段文件（mmap 映射）"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, 'rb')
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self._mmap)
+
+        (magic, version, _, self.resolution, self.start_ts, self.end_ts,
+         n_rows, n_accounts, n_fleet, fields_len) = SEGMENT_HEADER.unpack_from(view, 0)
+        if magic != SEGMENT_MAGIC or version != SEGMENT_VERSION:
+            self.close()
+            raise ValueError(f"无效的段文件: {path}")
+
+        offset = SEGMENT_HEADER.size
+        self.fields: List[str] = json.loads(bytes(view[offset:offset + fields_len]).decode('utf-8'))
+        offset = _pad8(offset + fields_len)
+
+        def take(fmt: str, count: int) -> memoryview:
+            nonlocal offset
+            size = count * (4 if fmt == 'I' else 8)
+            section = view[offset:offset + size].cast(fmt)
+            offset = _pad8(offset + size)
+            return section
+
+        self.account_ids = take('I', n_accounts)
+        self.account_offsets = take('I', n_accounts + 1)
+        self.timestamps = take('I', n_rows)
+        self.values = {name: take('d', n_rows) for name in self.fields}
+        self.fleet_timestamps = take('I', n_fleet)
+        self.fleet_counts = take('I', n_fleet)
+        self.fleet_values = {name: take('d', n_fleet) for name in self.fields}
+        self._views = [view, self.account_ids, self.account_offsets, self.timestamps,
+                       self.fleet_timestamps, self.fleet_counts,
+                       *self.values.values(), *self.fleet_values.values()]
+
+    @property
+    def n_rows(self) -> int:
+        return len(self.timestamps)
+
+    @property
+    def is_raw(self) -> bool:
+        """原始段（未降采样）"""
+        return self.resolution == 0
+
+    def overlaps(self, start: int, end: int) -> bool:
+        return self.start_ts < end and self.end_ts > start
+
+    def account_rows(self, account_index: int) -> Tuple[int, int]:
+        """返回账号在段中的行区间 [lo, hi)"""
+        pos = bisect.bisect_left(self.account_ids, account_index)
+        if pos < len(self.account_ids) and self.account_ids[pos] == account_index:
+            return self.account_offsets[pos], self.account_offsets[pos + 1]
+        return 0, 0
+
+    def iter_accounts(self) -> Iterable[Tuple[int, int, int]]:
+        for pos in range(len(self.account_ids)):
+            yield self.account_ids[pos], self.account_offsets[pos], self.account_offsets[pos + 1]
+
+    def close(self):
+        for view in getattr(self, '_views', []):
+            view.release()
+        self._views = []
+        if getattr(self, '_mmap', None) is not None:
+            self._mmap.close()
+            self._mmap = None
+        if getattr(self, '_file', None) is not None:
+            self._file.close()
+            self._file = None
+
+
+def write_segment(path: str, resolution: int, start_ts: int, end_ts: int, fields: List[str],
+                  rows: Dict[int, List[Tuple[int, List[float]]]],
+                  fleet_rows: Optional[Dict[int, List[Tuple[int, List[float]]]]] = None) -> None:
+    """写入段文件（先写临时文件再原子替换）
+
+    rows: 账号索引 -> 按时间排序的 [(时间戳, 与 fields 对应的值列表)]
+    同时预计算全网汇总（每个账号在每个汇总桶内取最后一个采样后求和），
+    fleet_rows 不为 None 时按 fleet_rows 而不是 rows 计算（原始段只写入已封存的桶）
+    头部的时间范围按实际数据扩展，保证不会小于段内数据的范围
+    """
+    for samples in rows.values():
+        if samples:
+            start_ts = min(start_ts, samples[0][0])
+            end_ts = max(end_ts, samples[-1][0] + 1)
+
+    account_ids = array('I')
+    account_offsets = array('I', [0])
+    timestamps = array('I')
+    columns = [array('d') for _ in fields]
+
+    fleet_step = max(resolution, FLEET_STEP)
+    fleet: Dict[int, List] = {}
+
+    for account_index in sorted(rows):
+        samples = rows[account_index]
+        if not samples:
+            continue
+        account_ids.append(account_index)
+        for ts, values in samples:
+            timestamps.append(ts - start_ts)
+            for column, value in zip(columns, values):
+                column.append(value)
+        account_offsets.append(len(timestamps))
+
+    for samples in (rows if fleet_rows is None else fleet_rows).values():
+        last_in_bucket: Dict[int, List[float]] = {}
+        for ts, values in samples:
+            last_in_bucket[ts // fleet_step * fleet_step] = values
+        for bucket, values in last_in_bucket.items():
+            entry = fleet.get(bucket)
+            if entry is None:
+                entry = fleet[bucket] = [0, [0.0] * len(fields)]
+            entry[0] += 1
+            sums = entry[1]
+            for i, value in enumerate(values):
+                if value == value:  # 跳过 NaN
+                    sums[i] += value
+
+    fleet_timestamps = array('I')
+    fleet_counts = array('I')
+    fleet_columns = [array('d') for _ in fields]
+    for bucket in sorted(fleet):
+        count, sums = fleet[bucket]
+        fleet_timestamps.append(bucket - start_ts)
+        fleet_counts.append(count)
+        for column, value in zip(fleet_columns, sums):
+            column.append(value)
+
+    fields_blob = json.dumps(fields, ensure_ascii=False).encode('utf-8')
+    header = SEGMENT_HEADER.pack(SEGMENT_MAGIC, SEGMENT_VERSION, 0, resolution, start_ts, end_ts,
+                                 len(timestamps), len(account_ids), len(fleet_timestamps),
+                                 len(fields_blob))
+
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        written = 0
+
+        def put(blob: bytes):
+            nonlocal written
+            f.write(blob)
+            written += len(blob)
+            padding = _pad8(written) - written
+            if padding:
+                f.write(b'\0' * padding)
+                written += padding
+
+        f.write(header)
+        written = len(header)
+        put(fields_blob)
+        for section in (account_ids, account_offsets, timestamps, *columns,
+                        fleet_timestamps, fleet_counts, *fleet_columns):
+            put(section.tobytes())
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class EarningsHistory:
+    """账号收益时序存储"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.lock = threading.RLock()
+        self.compact_lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+        self._accounts_path = os.path.join(directory, 'accounts.log')
+        self._head_path = os.path.join(directory, 'head.log')
+        self.account_ids: List[str] = []
+        self.account_index: Dict[str, int] = {}
+        self.segments: List[Segment] = []
+        # 未落盘采样: (账号索引, 时间戳, {字段: 值})
+        self.head: List[Tuple[int, int, Dict[str, float]]] = []
+        # 未封存的全网汇总桶: 桶时间 -> 账号索引 -> (时间戳, {字段: 值})，早于 _sealed_until 的桶已写入段
+        self._open_fleet: Dict[int, Dict[int, Tuple[int, Dict[str, float]]]] = {}
+        self._sealed_until = 0
+        self._seq = 0
+
+        self._load()
+        self._head_file = open(self._head_path, 'a', encoding='utf-8')
+
+    # ---------- 加载 ----------
+
+    def _load(self):
+        if os.path.exists(self._accounts_path):
+            with open(self._accounts_path, 'r', encoding='utf-8') as f:
+                self.account_ids = [line.rstrip('\n') for line in f if line.endswith('\n')]
+            self.account_index = {aid: i for i, aid in enumerate(self.account_ids)}
+        self._accounts_file = open(self._accounts_path, 'a', encoding='utf-8')
+
+        names = sorted(os.listdir(self.directory))
+        # 未完成的落盘：其写出的段可能不完整，删除后由预写日志重新回放
+        flushing = [name for name in names if name.startswith('head.') and name.endswith('.flushing')]
+        unfinished = tuple(f"-flush{name.split('.')[1]}-" for name in flushing)
+
+        for name in names:
+            path = os.path.join(self.directory, name)
+            if name.endswith('.tmp') or (unfinished and name.endswith(SEGMENT_SUFFIX)
+                                         and any(tag in name for tag in unfinished)):
+                os.remove(path)
+            elif name.endswith(SEGMENT_SUFFIX):
+                try:
+                    self.segments.append(Segment(path))
+                except Exception as e:
+                    logger.error(f"加载收益历史段失败 {name}: {e}")
+        self.segments.sort(key=lambda seg: (seg.start_ts, seg.resolution))
+
+        # 先回放未完成落盘的日志，再回放当前日志；回放后合并写回 head.log
+        replay = [os.path.join(self.directory, name) for name in flushing]
+        replay.append(self._head_path)
+        for path in replay:
+            if not os.path.exists(path):
+                continue
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                        self.head.append((self._index_for(record['a']), int(record['t']), record['v']))
+                    except Exception:
+                        # 进程崩溃时最后一行可能不完整
+                        continue
+        if flushing:
+            self._rewrite_head()
+            for name in flushing:
+                os.remove(os.path.join(self.directory, name))
+        self._rebuild_open_fleet()
+
+    def _rebuild_open_fleet(self):
+        """根据已有段的全网汇总确定封存位置，用之后的原始行和内存采样重建未封存的桶"""
+        for seg in self.segments:
+            if not seg.is_raw:
+                self._sealed_until = max(self._sealed_until, seg.end_ts)
+            elif len(seg.fleet_timestamps):
+                self._sealed_until = max(self._sealed_until,
+                                         seg.start_ts + seg.fleet_timestamps[-1] + FLEET_STEP)
+
+        for seg in self.segments:
+            if not seg.is_raw or seg.end_ts <= self._sealed_until:
+                continue
+            offset = max(self._sealed_until - seg.start_ts, 0)
+            for account_index, lo, hi in seg.iter_accounts():
+                for row in range(bisect.bisect_left(seg.timestamps, offset, lo, hi), hi):
+                    values = {name: column[row] for name, column in seg.values.items()
+                              if column[row] == column[row]}
+                    self._track_fleet(account_index, seg.start_ts + seg.timestamps[row], values)
+        for sample in self.head:
+            self._track_fleet(*sample)
+
+    def _track_fleet(self, index: int, ts: int, values: Dict[str, float]):
+        bucket = ts // FLEET_STEP * FLEET_STEP
+        # 已封存的桶之后到达的采样只在降采样合并时计入全网汇总
+        if bucket < self._sealed_until:
+            return
+        accounts = self._open_fleet.get(bucket)
+        if accounts is None:
+            accounts = self._open_fleet[bucket] = {}
+        previous = accounts.get(index)
+        if previous is None or previous[0] <= ts:
+            accounts[index] = (ts, values)
+
+    def _seal_fleet(self) -> Dict[int, Dict[int, List[Tuple[int, Dict[str, float]]]]]:
+        """封存最新采样所在桶之前的全网汇总桶，返回 自然日 -> 账号索引 -> 各桶的最后一个采样"""
+        sealed: Dict[int, Dict[int, List[Tuple[int, Dict[str, float]]]]] = {}
+        if not self._open_fleet:
+            return sealed
+        cutoff = max(self._open_fleet)
+        for bucket in sorted(b for b in self._open_fleet if b < cutoff):
+            accounts = sealed.setdefault(bucket // DAY * DAY, {})
+            for index, sample in self._open_fleet.pop(bucket).items():
+                accounts.setdefault(index, []).append(sample)
+        self._sealed_until = max(self._sealed_until, cutoff)
+        return sealed
+
+    def _rewrite_head(self):
+        tmp_path = self._head_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for index, ts, values in self.head:
+                f.write(json.dumps({"a": self.account_ids[index], "t": ts, "v": values},
+                                   ensure_ascii=False) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self._head_path)
+
+    def _index_for(self, account_id: str) -> int:
+        index = self.account_index.get(account_id)
+        if index is None:
+            index = len(self.account_ids)
+            self.account_ids.append(account_id)
+            self.account_index[account_id] = index
+            self._accounts_file.write(account_id + '\n')
+            self._accounts_file.flush()
+        return index
+
+    def _segment_path(self, resolution: int, start_ts: int, tag: Optional[str] = None) -> str:
+        self._seq += 1
+        return os.path.join(self.directory,
+                            f"{start_ts}-{resolution}-{tag or time.time_ns()}-{self._seq}{SEGMENT_SUFFIX}")
+
+    # ---------- 写入 ----------
+
+    def append(self, account_id: str, data: Dict, timestamp: Optional[float] = None) -> bool:
+        """追加一条 earn/info 采样"""
+        values = extract_numeric_fields(data)
+        if not values:
+            return False
+        ts = int(timestamp if timestamp is not None else time.time())
+        with self.lock:
+            index = self._index_for(account_id)
+            self.head.append((index, ts, values))
+            self._track_fleet(index, ts, values)
+            self._head_file.write(json.dumps({"a": account_id, "t": ts, "v": values}, ensure_ascii=False) + '\n')
+            self._head_file.flush()
+            should_flush = len(self.head) >= MAX_HEAD_ROWS
+        if should_flush:
+            self.flush(compact=False)
+        return True
+
+    def flush(self, compact: bool = True, now: Optional[float] = None) -> int:
+        """将内存中的采样落盘为原始段（按自然日切分），并按需降采样合并旧段"""
+        with self.lock:
+            head, self.head = self.head, []
+            if head:
+                # 先原子地轮转预写日志，落盘中途崩溃时重启可据此丢弃本次写出的段，避免重复回放
+                flush_id = time.time_ns()
+                flushing_path = os.path.join(self.directory, f"head.{flush_id}.flushing")
+                self._head_file.close()
+                os.replace(self._head_path, flushing_path)
+                self._head_file = open(self._head_path, 'a', encoding='utf-8')
+
+                by_day: Dict[int, List[Tuple[int, int, Dict[str, float]]]] = {}
+                for sample in head:
+                    by_day.setdefault(sample[1] // DAY * DAY, []).append(sample)
+                sealed = self._seal_fleet()
+
+                for day_start in sorted(set(by_day) | set(sealed)):
+                    samples = by_day.get(day_start, [])
+                    sealed_samples = sealed.get(day_start, {})
+                    fields = sorted({name for _, _, values in samples for name in values}
+                                    | {name for account_samples in sealed_samples.values()
+                                       for _, values in account_samples for name in values})
+                    rows: Dict[int, List[Tuple[int, List[float]]]] = {}
+                    for index, ts, values in samples:
+                        rows.setdefault(index, []).append((ts, [values.get(name, NAN) for name in fields]))
+                    for account_rows in rows.values():
+                        account_rows.sort(key=lambda row: row[0])
+                    fleet_rows = {index: [(ts, [values.get(name, NAN) for name in fields])
+                                          for ts, values in account_samples]
+                                  for index, account_samples in sealed_samples.items()}
+                    path = self._segment_path(0, day_start, f"flush{flush_id}")
+                    write_segment(path, 0, day_start, day_start + DAY, fields, rows, fleet_rows)
+                    self.segments.append(Segment(path))
+                self.segments.sort(key=lambda seg: (seg.start_ts, seg.resolution))
+                os.remove(flushing_path)
+
+        if compact and head:
+            self.compact(now)
+        return len(head)
+
+    def compact(self, now: Optional[float] = None) -> int:
+        """按 DOWNSAMPLE_TIERS 合并并降采样旧段，返回重写的段数"""
+        now = int(now if now is not None else time.time())
+        rewritten = 0
+        with self.compact_lock:
+            with self.lock:
+                groups: Dict[Tuple[int, int, int], List[Segment]] = {}
+                for seg in self.segments:
+                    target = self._target_tier(seg, now)
+                    if target is not None:
+                        groups.setdefault(target, []).append(seg)
+
+            for (resolution, window_start, window), group in groups.items():
+                if len(group) == 1 and group[0].resolution == resolution \
+                        and group[0].start_ts == window_start and group[0].end_ts == window_start + window:
+                    continue
+                path = self._segment_path(resolution, window_start)
+                self._merge(path, resolution, window_start, window_start + window, group)
+                merged = Segment(path)
+                with self.lock:
+                    self.segments = [seg for seg in self.segments if seg not in group] + [merged]
+                    self.segments.sort(key=lambda seg: (seg.start_ts, seg.resolution))
+                    # 合并后的段已包含窗口内完整的全网汇总
+                    window_end = window_start + window
+                    for bucket in [b for b in self._open_fleet if window_start <= b < window_end]:
+                        del self._open_fleet[bucket]
+                    self._sealed_until = max(self._sealed_until, window_end)
+                    for seg in group:
+                        seg.close()
+                        os.remove(seg.path)
+                rewritten += len(group)
+
+        if rewritten:
+            logger.info(f"收益历史降采样: 合并 {rewritten} 个段")
+        return rewritten
+
+    @staticmethod
+    def _target_tier(seg: Segment, now: int) -> Optional[Tuple[int, int, int]]:
+        target = None
+        for age, resolution, window in DOWNSAMPLE_TIERS:
+            if resolution < seg.resolution:
+                continue
+            window_start = seg.start_ts // window * window
+            if window_start + window + age <= now:
+                target = (resolution, window_start, window)
+        return target
+
+    @staticmethod
+    def _merge(path: str, resolution: int, start_ts: int, end_ts: int, group: List[Segment]):
+        """逐账号合并多个段，每个桶保留最后一个采样"""
+        fields = sorted({name for seg in group for name in seg.fields})
+        order = sorted(group, key=lambda seg: (seg.start_ts, seg.resolution))
+        accounts = sorted({account_index for seg in order for account_index in seg.account_ids})
+
+        rows: Dict[int, List[Tuple[int, List[float]]]] = {}
+        for account_index in accounts:
+            buckets: Dict[int, Tuple[int, List[float]]] = {}
+            for seg in order:
+                lo, hi = seg.account_rows(account_index)
+                if lo == hi:
+                    continue
+                columns = [seg.values.get(name) for name in fields]
+                for row in range(lo, hi):
+                    ts = seg.start_ts + seg.timestamps[row]
+                    bucket = ts // resolution * resolution
+                    previous = buckets.get(bucket)
+                    if previous is None or previous[0] <= ts:
+                        buckets[bucket] = (ts, [column[row] if column is not None else NAN
+                                                for column in columns])
+            rows[account_index] = [(bucket, buckets[bucket][1]) for bucket in sorted(buckets)]
+
+        write_segment(path, resolution, start_ts, end_ts, fields, rows)
+
+    # ---------- 查询 ----------
+
+    def query(self, account_id: Optional[str] = None, start: Optional[int] = None,
+              end: Optional[int] = None, fields: Optional[List[str]] = None,
+              step: Optional[int] = None) -> Dict:
+        """查询时间范围内的序列
+
+        指定 account_id 时返回单账号序列，否则返回全网汇总（各账号在桶内最后一个采样之和）。
+        step 为聚合桶宽（秒），每个桶取最后一个值；全网汇总的桶宽不小于 FLEET_STEP。
+        """
+        end = int(end if end is not None else time.time()) + 1
+        start = int(start if start is not None else 0)
+
+        with self.lock:
+            available = sorted({name for seg in self.segments for name in seg.fields}
+                               | {name for _, _, values in self.head for name in values})
+            names = [name for name in (fields or available) if name in available]
+
+            if account_id is not None:
+                points = self._account_points(account_id, start, end, names)
+                counts = None
+            else:
+                step = max(step or FLEET_STEP, FLEET_STEP)
+                points, counts = self._fleet_points(start, end, names)
+
+        if step:
+            bucketed: Dict[int, List[float]] = {}
+            bucketed_counts: Dict[int, int] = {}
+            for ts, values in points:
+                bucket = ts // step * step
+                bucketed[bucket] = values
+                if counts is not None:
+                    bucketed_counts[bucket] = counts[ts]
+            points = sorted(bucketed.items())
+            if counts is not None:
+                counts = bucketed_counts
+
+        result = {
+            "account_id": account_id,
+            "start": start,
+            "end": end - 1,
+            "step": step,
+            "fields": names,
+            "timestamps": [ts for ts, _ in points],
+            "values": {name: [None if values[i] != values[i] else values[i] for _, values in points]
+                       for i, name in enumerate(names)},
+        }
+        if counts is not None:
+            result["accounts"] = [counts[ts] for ts, _ in points]
+        return result
+
+    def _account_points(self, account_id: str, start: int, end: int,
+                        names: List[str]) -> List[Tuple[int, List[float]]]:
+        index = self.account_index.get(account_id)
+        if index is None:
+            return []
+
+        points: List[Tuple[int, List[float]]] = []
+        for seg in self.segments:
+            if not seg.overlaps(start, end):
+                continue
+            lo, hi = seg.account_rows(index)
+            if lo == hi:
+                continue
+            lo = bisect.bisect_left(seg.timestamps, max(start - seg.start_ts, 0), lo, hi)
+            hi = bisect.bisect_left(seg.timestamps, max(end - seg.start_ts, 0), lo, hi)
+            columns = [seg.values.get(name) for name in names]
+            for row in range(lo, hi):
+                points.append((seg.start_ts + seg.timestamps[row],
+                               [column[row] if column is not None else NAN for column in columns]))
+
+        for sample_index, ts, values in self.head:
+            if sample_index == index and start <= ts < end:
+                points.append((ts, [values.get(name, NAN) for name in names]))
+
+        points.sort(key=lambda point: point[0])
+        return points
+
+    def _fleet_points(self, start: int, end: int,
+                      names: List[str]) -> Tuple[List[Tuple[int, List[float]]], Dict[int, int]]:
+        totals: Dict[int, List[float]] = {}
+        counts: Dict[int, int] = {}
+
+        # 已封存的桶使用段中预计算的全网汇总
+        for seg in self.segments:
+            if not len(seg.fleet_timestamps) or not seg.overlaps(start, end):
+                continue
+            columns = [seg.fleet_values.get(name) for name in names]
+            for row in range(len(seg.fleet_timestamps)):
+                ts = seg.start_ts + seg.fleet_timestamps[row]
+                if start <= ts < end:
+                    totals[ts] = [column[row] if column is not None else 0.0 for column in columns]
+                    counts[ts] = seg.fleet_counts[row]
+
+        # 未封存的桶（通常只有最近一两个）由每个账号的最后一个采样即时汇总
+        for bucket, accounts in self._open_fleet.items():
+            if not start <= bucket < end:
+                continue
+            sums = [0.0] * len(names)
+            for _, values in accounts.values():
+                for i, name in enumerate(names):
+                    value = values.get(name)
+                    if value is not None:
+                        sums[i] += value
+            totals[bucket] = sums
+            counts[bucket] = len(accounts)
+
+        return sorted(totals.items()), counts
+
+    def stats(self) -> Dict:
+        """存储统计信息"""
+        with self.lock:
+            return {
+                "accounts": len(self.account_ids),
+                "segments": len(self.segments),
+                "rows": sum(seg.n_rows for seg in self.segments),
+                "head_rows": len(self.head),
+                "bytes": sum(os.path.getsize(seg.path) for seg in self.segments),
+            }
+
+    def close(self):
+        with self.lock:
+            self._accounts_file.close()
+            self._head_file.close()
+            for seg in self.segments:
+                seg.close()
+            self.segments = []
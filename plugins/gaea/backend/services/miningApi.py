@@ -4,19 +4,51 @@
 提供HTTP API来控制Python挖矿服务
 """
 
+import hmac
 import json
 import logging
-from flask import Flask, request, jsonify
+import math
+import os
+from functools import wraps
+from flask import Flask, Response, request, jsonify
 from flask_cors import CORS
-from miningService import mining_service
+from miningService import configure_logging, get_mining_service
+from miningProfiler import StackSampler, LockProfiler, dump_thread_stacks
+from ndjsonStream import iter_ndjson
 
 # 配置日志
-logging.basicConfig(level=logging.INFO)
+configure_logging()
 logger = logging.getLogger(__name__)
 
+mining_service = get_mining_service()
+
 app = Flask(__name__)
 CORS(app)
 
+NDJSON_MIMETYPES = ('application/x-ndjson', 'application/ndjson', 'application/jsonl')
+
+# 诊断工具（仅在调用对应接口时启用）
+stack_sampler = StackSampler()
+lock_profiler = LockProfiler(mining_service, 'lock')
+
+def admin_required(func):
+    """诊断接口需设置 MINING_ADMIN_TOKEN 并在请求头 X-Admin-Token 中携带，未设置时接口禁用"""
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        token = os.environ.get('MINING_ADMIN_TOKEN')
+        if not token:
+            return jsonify({
+                "success": False,
+                "error": "未配置 MINING_ADMIN_TOKEN，诊断接口已禁用"
+            }), 403
+        if not hmac.compare_digest(request.headers.get('X-Admin-Token', ''), token):
+            return jsonify({
+                "success": False,
+                "error": "无权限"
+            }), 403
+        return func(*args, **kwargs)
+    return wrapper
+
 @app.route('/api/mining/status', methods=['GET'])
 def get_status():
     """获取挖矿状态"""
@@ -80,20 +112,41 @@ def add_account():
 
 @app.route('/api/mining/sync-accounts', methods=['POST'])
 def sync_accounts():
-    """同步账号数据"""
+    """同步账号数据
+
+    支持两种请求体：
+    - application/json: {"accounts": [...]}
+    - application/x-ndjson: 每行一个账号，可配合 Content-Encoding: gzip / zstd 流式读取
+    """
     try:
-        data = request.get_json()
-        if not data or 'accounts' not in data:
+        errors = []
+        if request.mimetype in NDJSON_MIMETYPES:
+            records = iter_ndjson(request.stream, request.headers.get('Content-Encoding'))
+            count = mining_service.sync_accounts_from_database(records, errors, allow_empty=False)
+        else:
+            data = request.get_json()
+            if not data or 'accounts' not in data:
+                return jsonify({
+                    "success": False,
+                    "error": "缺少账号数据"
+                }), 400
+            count = mining_service.sync_accounts_from_database(data['accounts'], errors)
+        
+        progress = mining_service.get_sync_progress()
+        if progress["state"] == "failed":
             return jsonify({
                 "success": False,
-                "error": "缺少账号数据"
+                "error": progress["error"],
+                "progress": progress,
+                "errors": errors
             }), 400
         
-        count = mining_service.sync_accounts_from_database(data['accounts'])
         return jsonify({
             "success": True,
             "message": f"同步 {count} 个账号",
-            "count": count
+            "count": count,
+            "progress": progress,
+            "errors": errors
         })
     except Exception as e:
         logger.error(f"同步账号失败: {e}")
@@ -102,6 +155,21 @@ def sync_accounts():
             "error": str(e)
         }), 500
 
+@app.route('/api/mining/sync-accounts/progress', methods=['GET'])
+def get_sync_progress():
+    """获取账号同步进度"""
+    try:
+        return jsonify({
+            "success": True,
+            "data": mining_service.get_sync_progress()
+        })
+    except Exception as e:
+        logger.error(f"获取同步进度失败: {e}")
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 500
+
 @app.route('/api/mining/accounts/<account_id>', methods=['DELETE'])
 def remove_account(account_id):
     """移除账号"""
@@ -202,6 +270,29 @@ def stop_all_accounts():
             "error": str(e)
         }), 500
 
+@app.route('/api/mining/history', methods=['GET'])
+def get_history():
+    """获取收益历史"""
+    try:
+        fields = request.args.get('fields')
+        history = mining_service.get_earnings_history(
+            account_id=request.args.get('account_id'),
+            start=request.args.get('start', type=int),
+            end=request.args.get('end', type=int),
+            fields=fields.split(',') if fields else None,
+            step=request.args.get('step', type=int)
+        )
+        return jsonify({
+            "success": True,
+            "data": history
+        })
+    except Exception as e:
+        logger.error(f"获取收益历史失败: {e}")
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 500
+
 @app.route('/api/mining/logs', methods=['GET'])
 def get_logs():
     """获取日志"""
@@ -219,5 +310,142 @@ def get_logs():
             "error": str(e)
         }), 500
 
+@app.route('/api/mining/debug/profile/start', methods=['POST'])
+@admin_required
+def start_profile():
+    """开始采样所有线程调用栈"""
+    try:
+        data = request.get_json(silent=True) or {}
+        try:
+            duration = float(data.get('duration', 10))
+            interval = float(data.get('interval', 0.01))
+            if not (math.isfinite(duration) and math.isfinite(interval)):
+                raise ValueError
+        except (TypeError, ValueError):
+            return jsonify({
+                "success": False,
+                "error": "duration 和 interval 必须是数字"
+            }), 400
+        if not stack_sampler.start(duration, interval):
+            return jsonify({
+                "success": False,
+                "error": "采样正在进行中"
+            }), 409
+        return jsonify({
+            "success": True,
+            "data": stack_sampler.get_status()
+        })
+    except Exception as e:
+        logger.error(f"开始采样失败: {e}")
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 500
+
+@app.route('/api/mining/debug/profile/stop', methods=['POST'])
+@admin_required
+def stop_profile():
+    """提前结束采样"""
+    try:
+        stack_sampler.stop()
+        return jsonify({
+            "success": True,
+            "data": stack_sampler.get_status()
+        })
+    except Exception as e:
+        logger.error(f"结束采样失败: {e}")
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 500
+
+@app.route('/api/mining/debug/profile', methods=['GET'])
+@admin_required
+def get_profile():
+    """获取采样结果（format=collapsed 时返回折叠栈文本，可直接用于 flamegraph.pl / speedscope）"""
+    try:
+        if request.args.get('format') == 'collapsed':
+            return Response(stack_sampler.collapsed(), mimetype='text/plain')
+        return jsonify({
+            "success": True,
+            "data": stack_sampler.get_status()
+        })
+    except Exception as e:
+        logger.error(f"获取采样结果失败: {e}")
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 500
+
+@app.route('/api/mining/debug/threads', methods=['GET'])
+@admin_required
+def get_threads():
+    """获取当前线程栈（按相同调用栈分组）"""
+    try:
+        groups = dump_thread_stacks()
+        return jsonify({
+            "success": True,
+            "data": {
+                "total_threads": sum(group["count"] for group in groups),
+                "groups": groups
+            }
+        })
+    except Exception as e:
+        logger.error(f"获取线程栈失败: {e}")
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 500
+
+@app.route('/api/mining/debug/lock/start', methods=['POST'])
+@admin_required
+def start_lock_profile():
+    """开始统计 MiningService.lock 持有时间"""
+    try:
+        started = lock_profiler.start()
+        return jsonify({
+            "success": started,
+            "data": lock_profiler.get_stats()
+        })
+    except Exception as e:
+        logger.error(f"开始锁统计失败: {e}")
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 500
+
+@app.route('/api/mining/debug/lock/stop', methods=['POST'])
+@admin_required
+def stop_lock_profile():
+    """停止统计锁持有时间并还原原始锁"""
+    try:
+        lock_profiler.stop()
+        return jsonify({
+            "success": True,
+            "data": lock_profiler.get_stats()
+        })
+    except Exception as e:
+        logger.error(f"停止锁统计失败: {e}")
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 500
+
+@app.route('/api/mining/debug/lock', methods=['GET'])
+@admin_required
+def get_lock_profile():
+    """获取锁等待/持有时间统计"""
+    try:
+        return jsonify({
+            "success": True,
+            "data": lock_profiler.get_stats()
+        })
+    except Exception as e:
+        logger.error(f"获取锁统计失败: {e}")
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 500
+
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5001, debug=True)
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+挖矿调度时钟
+MiningService 的所有循环都写成"单步函数"：执行一次并返回距下次执行的秒数（返回 None 表示结束），
+由时钟负责调度：
+- SystemClock: 每个循环一个守护线程，使用真实时间 time.sleep
+- VirtualClock: 单线程事件队列，虚拟时间，用于在几秒内回放一整天的调度
+"""
+
+import heapq
+import threading
+import time
+from datetime import datetime
+from typing import Callable, List, Optional, Tuple
+
+StepFunction = Callable[..., Optional[float]]
+
+
+class SystemClock:
+    """真实时钟"""
+
+    def time(self) -> float:
+        return time.time()
+
+    def now(self) -> datetime:
+        return datetime.now()
+
+    def sleep(self, seconds: float):
+        time.sleep(seconds)
+
+    def spawn(self, step: StepFunction, *args, delay: float = 0.0) -> threading.Thread:
+        """在守护线程中循环执行 step，首次执行前等待 delay 秒"""
+        def loop():
+            if delay > 0:
+                self.sleep(delay)
+            while True:
+                interval = step(*args)
+                if interval is None:
+                    break
+                self.sleep(interval)
+
+        thread = threading.Thread(target=loop, name=getattr(step, '__name__', None), daemon=True)
+        thread.start()
+        return thread
+
+
+class VirtualClock:
+    """虚拟时钟
+
+    spawn 只把单步函数放入事件队列，run_until 按时间顺序依次执行。
+    单步执行期间调用 sleep（如模拟的请求耗时）只推进该步自己的时间，不阻塞其他事件，
+    下次执行时间 = 本步开始时间 + 本步内 sleep 的总时长 + 返回的间隔。
+    """
+
+    def __init__(self, start: Optional[float] = None):
+        self._now = float(start if start is not None else time.time())
+        self._elapsed = 0.0
+        self._seq = 0
+        self._queue: List[Tuple[float, int, StepFunction, tuple]] = []
+        self.steps = 0
+
+    def time(self) -> float:
+        return self._now + self._elapsed
+
+    def now(self) -> datetime:
+        return datetime.fromtimestamp(self.time())
+
+    def sleep(self, seconds: float):
+        self._elapsed += max(seconds, 0.0)
+
+    def spawn(self, step: StepFunction, *args, delay: float = 0.0) -> None:
+        self._schedule(self.time() + max(delay, 0.0), step, args)
+
+    def _schedule(self, when: float, step: StepFunction, args: tuple):
+        self._seq += 1
+        heapq.heappush(self._queue, (when, self._seq, step, args))
+
+    @property
+    def pending(self) -> int:
+        return len(self._queue)
+
+    def run_until(self, end: float) -> int:
+        """执行所有计划在 end 之前的事件，返回执行的步数"""
+        executed = 0
+        queue = self._queue
+        while queue and queue[0][0] < end:
+            when, _, step, args = heapq.heappop(queue)
+            self._now = max(self._now, when)
+            self._elapsed = 0.0
+            interval = step(*args)
+            executed += 1
+            if interval is not None:
+                self._schedule(self._now + self._elapsed + interval, step, args)
+        self._now = max(self._now, end)
+        self._elapsed = 0.0
+        self.steps += executed
+        return executed
+
+    def run_for(self, seconds: float) -> int:
+        return self.run_until(self.time() + seconds)
@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""
+挖矿服务诊断工具
+- 定时采样所有线程调用栈，输出 flamegraph 可用的折叠栈格式
+- 按相同调用栈分组导出当前线程栈
+- 统计 MiningService.lock 的等待/持有时间
+
+未启用时不产生任何开销：采样线程只在采样期间存在，锁计时通过临时替换锁对象实现，停止后还原为原始锁。
+"""
+
+import os
+import sys
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+# 单次采样的时长/间隔上限，避免误操作拖慢服务
+MAX_PROFILE_DURATION = 300
+MIN_PROFILE_INTERVAL = 0.001
+
+
+def _frame_label(code, lineno: int, cache: Dict) -> str:
+    key = (code, lineno)
+    label = cache.get(key)
+    if label is None:
+        label = f"{code.co_name} ({os.path.basename(code.co_filename)}:{lineno})"
+        cache[key] = label
+    return label
+
+
+def _stack_of(frame, cache: Dict) -> Tuple[str, ...]:
+    """从根到叶的调用栈"""
+    stack = []
+    while frame is not None:
+        stack.append(_frame_label(frame.f_code, frame.f_lineno, cache))
+        frame = frame.f_back
+    stack.reverse()
+    return tuple(stack)
+
+
+def dump_thread_stacks() -> List[Dict]:
+    """导出当前所有线程栈，按相同调用栈分组（线程数多的分组在前）"""
+    threads = {thread.ident: thread for thread in threading.enumerate()}
+    cache: Dict = {}
+    groups: Dict[Tuple[str, ...], List[str]] = {}
+    for ident, frame in sys._current_frames().items():
+        thread = threads.get(ident)
+        name = thread.name if thread is not None else str(ident)
+        groups.setdefault(_stack_of(frame, cache), []).append(name)
+
+    result = [{"count": len(names), "threads": sorted(names), "stack": list(stack)}
+              for stack, names in groups.items()]
+    result.sort(key=lambda group: group["count"], reverse=True)
+    return result
+
+
+class StackSampler:
+    """限时的全线程调用栈采样器"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.thread: Optional[threading.Thread] = None
+        self.stop_event = threading.Event()
+        self.counts: Dict[Tuple[str, ...], int] = {}
+        self.samples = 0
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.duration = 0.0
+        self.interval = 0.0
+
+    @property
+    def is_running(self) -> bool:
+        return self.thread is not None and self.thread.is_alive()
+
+    def start(self, duration: float = 10, interval: float = 0.01) -> bool:
+        """开始采样，已在采样时返回 False"""
+        with self.lock:
+            if self.is_running:
+                return False
+            self.duration = min(max(float(duration), 0.0), MAX_PROFILE_DURATION)
+            self.interval = min(max(float(interval), MIN_PROFILE_INTERVAL), MAX_PROFILE_DURATION)
+            self.counts = {}
+            self.samples = 0
+            self.started_at = time.time()
+            self.finished_at = None
+            self.stop_event.clear()
+            self.thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+            self.thread.start()
+            return True
+
+    def stop(self) -> bool:
+        """提前结束采样"""
+        if not self.is_running:
+            return False
+        self.stop_event.set()
+        self.thread.join()
+        return True
+
+    def _run(self):
+        own_ident = threading.get_ident()
+        cache: Dict = {}
+        counts = self.counts
+        deadline = time.monotonic() + self.duration
+        while not self.stop_event.is_set() and time.monotonic() < deadline:
+            for ident, frame in sys._current_frames().items():
+                if ident == own_ident:
+                    continue
+                stack = _stack_of(frame, cache)
+                counts[stack] = counts.get(stack, 0) + 1
+            self.samples += 1
+            # 等待不超过截止时间，保证采样按时结束
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            self.stop_event.wait(min(self.interval, remaining))
+        self.finished_at = time.time()
+
+    def collapsed(self) -> str:
+        """flamegraph 折叠栈格式: 每行 "帧1;帧2;...;帧N 次数" """
+        counts = dict(self.counts)
+        lines = [f"{';'.join(stack)} {count}" for stack, count in counts.items()]
+        lines.sort()
+        return "\n".join(lines) + ("\n" if lines else "")
+
+    def get_status(self) -> Dict:
+        return {
+            "is_running": self.is_running,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "duration": self.duration,
+            "interval": self.interval,
+            "samples": self.samples,
+            "stacks": len(self.counts)
+        }
+
+
+class LockStats:
+    """锁等待/持有时间统计"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.acquisitions = 0
+            self.total_wait = 0.0
+            self.max_wait = 0.0
+            self.total_hold = 0.0
+            self.max_hold = 0.0
+            # 调用位置 -> [次数, 总持有时间, 最大持有时间]
+            self.sites: Dict[str, List[float]] = {}
+
+    def record(self, site: str, wait: float, hold: float):
+        with self.lock:
+            self.acquisitions += 1
+            self.total_wait += wait
+            self.total_hold += hold
+            if wait > self.max_wait:
+                self.max_wait = wait
+            if hold > self.max_hold:
+                self.max_hold = hold
+            entry = self.sites.get(site)
+            if entry is None:
+                entry = self.sites[site] = [0, 0.0, 0.0]
+            entry[0] += 1
+            entry[1] += hold
+            if hold > entry[2]:
+                entry[2] = hold
+
+    def to_dict(self) -> Dict:
+        with self.lock:
+            sites = [{"site": site, "count": int(count), "total_hold": total, "max_hold": longest,
+                      "avg_hold": total / count if count else 0.0}
+                     for site, (count, total, longest) in self.sites.items()]
+            sites.sort(key=lambda entry: entry["total_hold"], reverse=True)
+            return {
+                "acquisitions": self.acquisitions,
+                "total_wait": self.total_wait,
+                "max_wait": self.max_wait,
+                "avg_wait": self.total_wait / self.acquisitions if self.acquisitions else 0.0,
+                "total_hold": self.total_hold,
+                "max_hold": self.max_hold,
+                "avg_hold": self.total_hold / self.acquisitions if self.acquisitions else 0.0,
+                "sites": sites
+            }
+
+
+class TimedLock:
+    """包装 threading.Lock，记录每次获取的等待时间、持有时间和调用位置"""
+
+    def __init__(self, lock, stats: LockStats):
+        self._lock = lock
+        self._stats = stats
+        self._acquired_at: Optional[float] = None
+        self._wait = 0.0
+        self._site = ""
+        self._labels: Dict = {}
+
+    def acquire(self, blocking: bool = True, timeout: float = -1) -> bool:
+        begin = time.perf_counter()
+        acquired = self._lock.acquire(blocking, timeout)
+        if acquired:
+            self._acquired_at = time.perf_counter()
+            self._wait = self._acquired_at - begin
+            caller = sys._getframe(1)
+            if caller.f_code.co_name == '__enter__':
+                caller = caller.f_back
+            self._site = _frame_label(caller.f_code, caller.f_lineno, self._labels)
+        return acquired
+
+    def release(self):
+        acquired_at, wait, site = self._acquired_at, self._wait, self._site
+        self._acquired_at = None
+        hold = time.perf_counter() - acquired_at if acquired_at is not None else None
+        self._lock.release()
+        # 在替换前通过原始锁获取的持有无法计时，忽略
+        if hold is not None:
+            self._stats.record(site, wait, hold)
+
+    def locked(self) -> bool:
+        return self._lock.locked()
+
+    def __enter__(self):
+        return self.acquire()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
+
+
+class LockProfiler:
+    """临时把 owner.<attr> 替换为 TimedLock 以统计锁的持有时间"""
+
+    def __init__(self, owner, attr: str = 'lock'):
+        self.owner = owner
+        self.attr = attr
+        self.stats = LockStats()
+        self.original = None
+        self.started_at: Optional[float] = None
+        self.lock = threading.Lock()
+
+    @property
+    def is_running(self) -> bool:
+        return self.original is not None
+
+    def start(self) -> bool:
+        with self.lock:
+            if self.is_running:
+                return False
+            self.stats.reset()
+            self.original = getattr(self.owner, self.attr)
+            # 包装同一个底层锁，替换期间新旧引用仍然互斥
+            setattr(self.owner, self.attr, TimedLock(self.original, self.stats))
+            self.started_at = time.time()
+            return True
+
+    def stop(self) -> bool:
+        with self.lock:
+            if not self.is_running:
+                return False
+            setattr(self.owner, self.attr, self.original)
+            self.original = None
+            return True
+
+    def get_stats(self) -> Dict:
+        stats = self.stats.to_dict()
+        stats["is_running"] = self.is_running
+        stats["started_at"] = self.started_at
+        return stats
@@ -11,22 +11,45 @@ import time
 import requests
 import threading
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Set
+from typing import Dict, Iterable, List, Optional, Set
 from dataclasses import dataclass, asdict
 import os
 import sys
+from earningsHistory import EarningsHistory
+from miningClock import SystemClock
 
-# 配置日志
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler(sys.stdout),
-        logging.FileHandler('mining_service.log')
-    ]
-)
 logger = logging.getLogger(__name__)
 
+def configure_logging():
+    """配置服务日志（控制台 + mining_service.log），由服务入口调用，导入本模块时不会创建日志文件"""
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        handlers=[
+            logging.StreamHandler(sys.stdout),
+            logging.FileHandler('mining_service.log')
+        ]
+    )
+
+# 账号记录的必要字段
+REQUIRED_ACCOUNT_FIELDS = ('id', 'name', 'uid', 'token')
+
+# 同步时最多返回的错误记录数
+MAX_SYNC_ERRORS = 100
+
+def validate_account_record(record) -> Optional[str]:
+    """校验单条账号记录，有效时返回 None，否则返回错误信息"""
+    if isinstance(record, Exception):
+        return str(record)
+    if not isinstance(record, dict):
+        return "记录不是JSON对象"
+    missing = [key for key in REQUIRED_ACCOUNT_FIELDS if key not in record]
+    if missing:
+        return f"缺少必要参数: {', '.join(missing)}"
+    if not isinstance(record['id'], str) or not record['id']:
+        return "账号ID无效"
+    return None
+
 @dataclass
 class MiningAccount:
     """挖矿账号信息"""
@@ -55,7 +78,14 @@ class MiningStatus:
 class MiningService:
     """挂机挖矿服务"""
     
-    def __init__(self):
+    def __init__(self, clock=None, http=None, history_dir: Optional[str] = 'earnings_history'):
+        """
+        clock: 时间源与调度（默认 SystemClock，模拟时传入 VirtualClock）
+        http: 发送请求的对象，需提供 requests 风格的 get/post（默认 requests）
+        history_dir: 收益历史存储目录，None 表示不记录
+        """
+        self.clock = clock or SystemClock()
+        self.http = http or requests
         self.accounts: Dict[str, MiningAccount] = {}
         self.running_accounts: Set[str] = set()
         self.status = MiningStatus()
@@ -63,14 +93,22 @@ class MiningService:
         self.lock = threading.Lock()
         self.ping_interval = 600  # 10分钟
         self.info_interval = 1800  # 30分钟
+        self.error_retry_interval = 60  # 出错后1分钟重试
         
         # 延迟启动线程管理
-        self.delayed_threads: Dict[str, threading.Thread] = {}
+        self.delayed_threads: Dict[str, Optional[threading.Thread]] = {}
         self.stop_delayed_start = False
         
+        # 最近一次账号同步进度
+        self.sync_progress: Optional[Dict] = None
+        
+        # 收益历史存储（首次使用时再打开）
+        self.history_dir = history_dir
+        self._history: Optional[EarningsHistory] = None
+        self._history_lock = threading.Lock()
+        
         # 启动状态更新线程
-        self.status_thread = threading.Thread(target=self._update_status_loop, daemon=True)
-        self.status_thread.start()
+        self.status_thread = self.clock.spawn(self._update_status_step)
         
         # logger.info("挂机挖矿服务初始化完成")
     
@@ -84,8 +122,8 @@ class MiningService:
                 browser_id=account_data.get('browser_id', ''),
                 token=account_data['token'],
                 proxy=account_data.get('proxy'),
-                created_at=datetime.now().isoformat(),
-                updated_at=datetime.now().isoformat()
+                created_at=self.clock.now().isoformat(),
+                updated_at=self.clock.now().isoformat()
             )
             
             with self.lock:
@@ -98,63 +136,99 @@ class MiningService:
             logger.error(f"添加账号失败: {e}")
             return False
     
-    def sync_accounts_from_database(self, accounts_data: List[Dict]) -> int:
-        """从数据库同步账号数据"""
+    def sync_accounts_from_database(self, accounts_data: Iterable, errors: Optional[List[Dict]] = None,
+                                    allow_empty: bool = True) -> int:
+        """从数据库同步账号数据
+
+        accounts_data 可以是列表或流式解析的迭代器，逐条校验，无效记录跳过并写入 errors（最多 MAX_SYNC_ERRORS 条）。
+        全部读取完成后再替换账号列表，读取中途失败、所有记录都无效或（allow_empty 为 False 时）没有任何记录时
+        保持原有账号不变，进度状态为 failed。
+        """
+        progress = {
+            "state": "running",
+            "processed": 0,
+            "synced": 0,
+            "errors": 0,
+            "started_at": self.clock.now().isoformat(),
+            "finished_at": None,
+            "error": None
+        }
+        self.sync_progress = progress
         try:
-            synced_count = 0
+            synced_accounts: Dict[str, MiningAccount] = {}
+            for index, account_data in enumerate(accounts_data):
+                progress["processed"] += 1
+                error = validate_account_record(account_data)
+                if error:
+                    progress["errors"] += 1
+                    if errors is not None and len(errors) < MAX_SYNC_ERRORS:
+                        errors.append({
+                            "index": index,
+                            "id": account_data.get('id') if isinstance(account_data, dict) else None,
+                            "error": error
+                        })
+                    continue
+                
+                now = self.clock.now().isoformat()
+                account = MiningAccount(
+                    id=account_data['id'],
+                    name=account_data['name'],
+                    uid=account_data['uid'],
+                    browser_id=account_data.get('browser_id', ''),
+                    token=account_data['token'],
+                    proxy=account_data.get('proxy'),
+                    created_at=account_data.get('created_at', now),
+                    updated_at=now
+                )
+                synced_accounts[account.id] = account
+                progress["synced"] = len(synced_accounts)
+            
+            synced_count = len(synced_accounts)
+            if synced_count == 0:
+                if progress["processed"] > 0:
+                    raise ValueError("没有有效的账号记录")
+                if not allow_empty:
+                    raise ValueError("缺少账号数据")
+            
             with self.lock:
                 # 保存当前正在运行的账号
                 running_account_ids = set(self.running_accounts)
                 
-                # 清空现有账号
+                # 替换现有账号
                 self.accounts.clear()
                 self.running_accounts.clear()
+                self.accounts.update(synced_accounts)
                 
-                # 添加新账号
-                for account_data in accounts_data:
-                    account_id = account_data['id']
-                    was_running = account_id in running_account_ids
-                    
-                    account = MiningAccount(
-                        id=account_id,
-                        name=account_data['name'],
-                        uid=account_data['uid'],
-                        browser_id=account_data.get('browser_id', ''),
-                        token=account_data['token'],
-                        proxy=account_data.get('proxy'),
-                        status='running' if was_running else 'stopped',  # 保持运行状态
-                        created_at=account_data.get('created_at', datetime.now().isoformat()),
-                        updated_at=datetime.now().isoformat()
-                    )
-                    
-                    self.accounts[account.id] = account
-                    
-                    # 如果之前正在运行，重新启动
-                    if was_running:
+                for account_id, account in synced_accounts.items():
+                    # 如果之前正在运行，保持运行状态并重新启动
+                    if account_id in running_account_ids:
+                        account.status = 'running'
                         self.running_accounts.add(account_id)
-                        # 启动账号的ping线程
-                        thread = threading.Thread(
-                            target=self._account_ping_loop,
-                            args=(account_id,),
-                            daemon=True
-                        )
-                        thread.start()
+                        # 启动账号的ping循环
+                        self.clock.spawn(self._account_ping_step, account_id)
                         # logger.info(f"重新启动账号挖矿: {account.name} ({account_id})")
-                    
-                    synced_count += 1
                 
                 self.status.total_accounts = len(self.accounts)
                 self.status.stopped_accounts = len(self.accounts)
                 self.status.running_accounts = 0
                 self.status.error_accounts = 0
-                self.status.last_update = datetime.now().isoformat()
+                self.status.last_update = self.clock.now().isoformat()
             
+            progress["state"] = "done"
+            progress["finished_at"] = self.clock.now().isoformat()
             # logger.info(f"同步账号数据: {synced_count} 个账号")
             return synced_count
         except Exception as e:
             logger.error(f"同步账号数据失败: {e}")
+            progress["state"] = "failed"
+            progress["error"] = str(e)
+            progress["finished_at"] = self.clock.now().isoformat()
             return 0
     
+    def get_sync_progress(self) -> Optional[Dict]:
+        """获取最近一次账号同步的进度"""
+        return dict(self.sync_progress) if self.sync_progress else None
+    
     def remove_account(self, account_id: str) -> bool:
         """移除账号"""
         try:
@@ -181,15 +255,10 @@ class MiningService:
                     if account_id not in self.running_accounts:
                         self.running_accounts.add(account_id)
                         account.status = "running"
-                        account.updated_at = datetime.now().isoformat()
+                        account.updated_at = self.clock.now().isoformat()
                         
-                        # 启动账号的ping线程
-                        thread = threading.Thread(
-                            target=self._account_ping_loop,
-                            args=(account_id,),
-                            daemon=True
-                        )
-                        thread.start()
+                        # 启动账号的ping循环
+                        self.clock.spawn(self._account_ping_step, account_id)
                         
                         # logger.info(f"开始账号挖矿: {account.name} ({account_id})")
                         return True
@@ -206,7 +275,7 @@ class MiningService:
                     self.running_accounts.remove(account_id)
                     if account_id in self.accounts:
                         self.accounts[account_id].status = "stopped"
-                        self.accounts[account_id].updated_at = datetime.now().isoformat()
+                        self.accounts[account_id].updated_at = self.clock.now().isoformat()
                     
                         # logger.info(f"停止账号挖矿: {account_id}")
                     return True
@@ -230,23 +299,10 @@ class MiningService:
             # 生成0-600秒的随机延迟
             delay_seconds = random.randint(0, 600)
             
-            # 创建延迟启动线程
-            def delayed_start(acc_id, delay):
-                import time
-                time.sleep(delay)
-                # 检查是否应该停止延迟启动
-                if not self.stop_delayed_start and acc_id in self.accounts:
-                    if self.start_account(acc_id):
-                        # logger.info(f"延迟启动账号挖矿: {self.accounts[acc_id].name} (延迟 {delay} 秒)")
-                        pass
-            
-            thread = threading.Thread(
-                target=delayed_start,
-                args=(account_id, delay_seconds),
-                daemon=True
+            # 创建延迟启动任务
+            self.delayed_threads[account_id] = self.clock.spawn(
+                self._delayed_start_step, account_id, delay=delay_seconds
             )
-            thread.start()
-            self.delayed_threads[account_id] = thread
             started_count += 1
         
         # logger.info(f"开始所有账号挖矿: {started_count}/{len(self.accounts)} (10分钟内随机启动)")
@@ -268,26 +324,36 @@ class MiningService:
         # logger.info(f"停止所有账号挖矿: {stopped_count}")
         return stopped_count
     
-    def _account_ping_loop(self, account_id: str):
-        """账号ping循环"""
-        while account_id in self.running_accounts:
-            try:
-                if account_id not in self.accounts:
-                    break
-                
-                account = self.accounts[account_id]
-                self._ping_account(account)
-                
-                # 等待下次ping
-                time.sleep(self.ping_interval)
-                
-            except Exception as e:
-                logger.error(f"账号 {account_id} ping循环错误: {e}")
-                with self.lock:
-                    if account_id in self.accounts:
-                        self.accounts[account_id].status = "error"
-                        self.accounts[account_id].error_count += 1
-                time.sleep(60)  # 错误后等待1分钟再重试
+    def _delayed_start_step(self, account_id: str) -> None:
+        """延迟启动账号（只执行一次）"""
+        # 检查是否应该停止延迟启动
+        if not self.stop_delayed_start and account_id in self.accounts:
+            if self.start_account(account_id):
+                # logger.info(f"延迟启动账号挖矿: {self.accounts[account_id].name}")
+                pass
+        return None
+    
+    def _account_ping_step(self, account_id: str) -> Optional[float]:
+        """账号ping循环的单步，返回距下次ping的秒数，账号停止后返回 None"""
+        if account_id not in self.running_accounts:
+            return None
+        try:
+            if account_id not in self.accounts:
+                return None
+            
+            account = self.accounts[account_id]
+            self._ping_account(account)
+            
+            # 等待下次ping
+            return self.ping_interval
+            
+        except Exception as e:
+            logger.error(f"账号 {account_id} ping循环错误: {e}")
+            with self.lock:
+                if account_id in self.accounts:
+                    self.accounts[account_id].status = "error"
+                    self.accounts[account_id].error_count += 1
+            return self.error_retry_interval  # 错误后等待1分钟再重试
     
     def _ping_account(self, account: MiningAccount):
         """执行账号ping"""
@@ -307,7 +373,7 @@ class MiningService:
             data = {
                 "uid": account.uid,
                 "browser_id": account.browser_id,
-                "timestamp": int(time.time()),
+                "timestamp": int(self.clock.time()),
                 "version": "3.0.20"
             }
             
@@ -319,13 +385,13 @@ class MiningService:
                     'https': account.proxy
                 }
             
-            response = requests.post(url, headers=headers, json=data, proxies=proxies, timeout=30)
+            response = self.http.post(url, headers=headers, json=data, proxies=proxies, timeout=30)
             
             if response.status_code == 200:
                 result = response.json()
                 if result.get('success'):
                     account.status = "running"
-                    account.last_ping = datetime.now().isoformat()
+                    account.last_ping = self.clock.now().isoformat()
                     account.error_count = 0
                     logger.info(f"账号 {account.name} ping成功: {result.get('data', {})}")
                 else:
@@ -370,12 +436,14 @@ class MiningService:
                     'https': account.proxy
                 }
             
-            response = requests.get(url, headers=headers, proxies=proxies, timeout=30)
+            response = self.http.get(url, headers=headers, proxies=proxies, timeout=30)
             
             if response.status_code == 200:
                 result = response.json()
                 if result.get('success'):
                     account.last_info = result.get('data', {})
+                    if self.history_dir:
+                        self.history.append(account.id, account.last_info, self.clock.time())
                     logger.info(f"账号 {account.name} 信息更新成功")
                 else:
                     logger.warning(f"账号 {account.name} 信息更新失败: {result.get('msg', 'Unknown error')}")
@@ -385,26 +453,29 @@ class MiningService:
         except Exception as e:
             logger.error(f"账号 {account.name} 信息更新异常: {e}")
     
-    def _update_status_loop(self):
-        """状态更新循环"""
-        while True:
-            try:
-                with self.lock:
-                    self.status.running_accounts = len(self.running_accounts)
-                    self.status.stopped_accounts = len(self.accounts) - len(self.running_accounts)
-                    self.status.error_accounts = sum(1 for acc in self.accounts.values() if acc.status == "error")
-                    self.status.last_update = datetime.now().isoformat()
-                
-                # 每30分钟更新一次账号信息
-                for account in self.accounts.values():
-                    if account.status == "running":
-                        self._update_account_info(account)
-                
-                time.sleep(self.info_interval)
-                
-            except Exception as e:
-                logger.error(f"状态更新循环错误: {e}")
-                time.sleep(60)
+    def _update_status_step(self) -> float:
+        """状态更新循环的单步，返回距下次更新的秒数"""
+        try:
+            with self.lock:
+                self.status.running_accounts = len(self.running_accounts)
+                self.status.stopped_accounts = len(self.accounts) - len(self.running_accounts)
+                self.status.error_accounts = sum(1 for acc in self.accounts.values() if acc.status == "error")
+                self.status.last_update = self.clock.now().isoformat()
+            
+            # 每30分钟更新一次账号信息
+            for account in list(self.accounts.values()):
+                if account.status == "running":
+                    self._update_account_info(account)
+            
+            # 本轮采样落盘并降采样旧数据
+            if self._history is not None:
+                self._history.flush(now=self.clock.time())
+            
+            return self.info_interval
+            
+        except Exception as e:
+            logger.error(f"状态更新循环错误: {e}")
+            return self.error_retry_interval
     
     def get_status(self) -> Dict:
         """获取服务状态"""
@@ -416,6 +487,33 @@ class MiningService:
                 "running_accounts": list(self.running_accounts)
             }
     
+    @property
+    def history(self) -> EarningsHistory:
+        """收益历史存储"""
+        if not self.history_dir:
+            raise RuntimeError("收益历史未启用")
+        if self._history is None:
+            with self._history_lock:
+                if self._history is None:
+                    self._history = EarningsHistory(self.history_dir)
+        return self._history
+    
+    def get_earnings_history(self, account_id: Optional[str] = None, start: Optional[int] = None,
+                             end: Optional[int] = None, fields: Optional[List[str]] = None,
+                             step: Optional[int] = None) -> Dict:
+        """获取收益历史序列（不指定账号时返回全网汇总），未启用收益历史时返回空序列"""
+        if not self.history_dir:
+            return {
+                "account_id": account_id,
+                "start": start,
+                "end": end,
+                "step": step,
+                "fields": [],
+                "timestamps": [],
+                "values": {}
+            }
+        return self.history.query(account_id=account_id, start=start, end=end, fields=fields, step=step)
+    
     def get_logs(self, limit: int = 100) -> List[str]:
         """获取日志"""
         try:
@@ -426,11 +524,29 @@ class MiningService:
             logger.error(f"获取日志失败: {e}")
             return []
 
-# 全局服务实例
-mining_service = MiningService()
+# 全局服务实例（首次使用时创建，导入本模块不会启动任何线程）
+_mining_service: Optional[MiningService] = None
+_mining_service_lock = threading.Lock()
+
+def get_mining_service() -> MiningService:
+    """获取全局服务实例"""
+    global _mining_service
+    if _mining_service is None:
+        with _mining_service_lock:
+            if _mining_service is None:
+                _mining_service = MiningService()
+    return _mining_service
+
+def __getattr__(name):
+    # 兼容 `from miningService import mining_service`，访问时才创建实例
+    if name == 'mining_service':
+        return get_mining_service()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 def main():
     """主函数"""
+    configure_logging()
+    get_mining_service()
     logger.info("挂机挖矿服务启动")
     
     # 保持服务运行
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+NDJSON 流式解析
+按块读取（可选 gzip/zstd 压缩的）请求体，逐行解析 JSON，内存占用与总大小无关
+"""
+
+import json
+import zlib
+from typing import BinaryIO, Iterator, Optional, Union
+
+try:
+    import zstandard
+except ImportError:  # zstd 为可选依赖
+    zstandard = None
+
+CHUNK_SIZE = 64 * 1024
+ZSTD_READ_SIZE = 4 * 1024
+
+# 单行最大字节数，超过时该行按错误记录处理
+MAX_LINE_BYTES = 1024 * 1024
+
+SUPPORTED_ENCODINGS = ('', 'identity', 'gzip', 'x-gzip', 'zstd')
+
+
+def _new_decompressor(encoding: str):
+    if encoding in ('gzip', 'x-gzip'):
+        return zlib.decompressobj(16 + zlib.MAX_WBITS)
+    if encoding == 'zstd':
+        if zstandard is None:
+            raise ValueError("未安装 zstandard，无法解析 zstd 数据")
+        return zstandard.ZstdDecompressor().decompressobj()
+    return None
+
+
+def iter_decompressed(stream: BinaryIO, content_encoding: Optional[str] = None) -> Iterator[bytes]:
+    """按块返回解压后的数据
+
+    支持多个 gzip 成员或 zstd 帧直接拼接（如 cat a.gz b.gz），数据截断或损坏时抛出 ValueError
+    """
+    encoding = (content_encoding or '').strip().lower()
+    if encoding not in SUPPORTED_ENCODINGS:
+        raise ValueError(f"不支持的压缩格式: {content_encoding}")
+
+    decompressor = _new_decompressor(encoding)
+    if decompressor is None:
+        while True:
+            chunk = stream.read(CHUNK_SIZE)
+            if not chunk:
+                return
+            yield chunk
+
+    is_zstd = encoding == 'zstd'
+    # zstd 无法限制单次解压输出，缩小每次输入以限制展开后的大小
+    read_size = ZSTD_READ_SIZE if is_zstd else CHUNK_SIZE
+    try:
+        while True:
+            data = stream.read(read_size)
+            if not data:
+                break
+            while data:
+                if decompressor.eof:
+                    # 上一个成员/帧已结束，剩余数据是下一个
+                    decompressor = _new_decompressor(encoding)
+                if is_zstd:
+                    out = decompressor.decompress(data)
+                    if out:
+                        yield out
+                else:
+                    # 限制单次解压输出，避免高压缩比数据一次性展开
+                    out = decompressor.decompress(data, CHUNK_SIZE)
+                    while out:
+                        yield out
+                        out = decompressor.decompress(decompressor.unconsumed_tail, CHUNK_SIZE)
+                data = decompressor.unused_data if decompressor.eof else b''
+        if not is_zstd:
+            tail = decompressor.flush()
+            if tail:
+                yield tail
+    except zlib.error as e:
+        raise ValueError(f"gzip 数据损坏: {e}")
+    except Exception as e:
+        if zstandard is not None and isinstance(e, zstandard.ZstdError):
+            raise ValueError(f"zstd 数据损坏: {e}")
+        raise
+    if not decompressor.eof:
+        raise ValueError(f"{encoding} 数据不完整")
+
+
+def iter_ndjson(stream: BinaryIO, content_encoding: Optional[str] = None) -> Iterator[Union[dict, list, str, int, float, None, ValueError]]:
+    """逐行解析 NDJSON，跳过空行
+
+    无法解析的行以 ValueError 实例的形式返回而不中断迭代，由调用方按记录处理
+    """
+    buffer = b''
+    overflow = False
+    for chunk in iter_decompressed(stream, content_encoding):
+        buffer += chunk
+        start = 0
+        while True:
+            end = buffer.find(b'\n', start)
+            if end < 0:
+                break
+            line = buffer[start:end]
+            start = end + 1
+            if overflow or len(line) > MAX_LINE_BYTES:
+                overflow = False
+                yield ValueError(f"记录超过 {MAX_LINE_BYTES} 字节")
+            elif line.strip():
+                yield _parse_line(line)
+        buffer = buffer[start:]
+        if len(buffer) > MAX_LINE_BYTES:
+            buffer = b''
+            overflow = True
+
+    if overflow:
+        yield ValueError(f"记录超过 {MAX_LINE_BYTES} 字节")
+    elif buffer.strip():
+        yield _parse_line(buffer)
+
+
+def _parse_line(line: bytes):
+    try:
+        return json.loads(line)
+    except ValueError as e:
+        return ValueError(f"JSON解析失败: {e}")
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+挖矿调度模拟
+使用虚拟时钟和模拟的 Gaea API 回放调度过程（start_all_accounts 的0-600秒随机启动、
+ping_interval、info_interval），输出每秒请求数分布、突发峰值和每个账号的ping间隔漂移，
+用于上线前调整负载分布。
+
+注意：_ping_account 会自行处理请求失败和异常，失败的ping仍按 ping_interval 调度，
+_account_ping_step 的60秒重试只在 _ping_account 之外出现异常时才会触发，模拟中不会出现。
+--error-rate 只会让失败的账号进入 error 状态，从而跳过下一轮信息更新，不改变ping的调度。
+
+用法:
+    python3 simulateScheduler.py                              # 10000 个账号，24 小时
+    python3 simulateScheduler.py --accounts 2000 --hours 6 --latency 0.5 --csv profile.csv
+    python3 simulateScheduler.py --drift-csv drift.csv                # 每个账号的ping间隔漂移，按最大漂移排序
+"""
+
+import argparse
+import csv
+import logging
+import os
+import random
+import sys
+import time
+from array import array
+from typing import Dict, List, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from miningClock import VirtualClock
+from miningService import MiningService  # 导入时不会创建全局服务实例
+
+
+class StubResponse:
+    """模拟的 requests.Response"""
+
+    def __init__(self, status_code: int, payload: Dict):
+        self.status_code = status_code
+        self._payload = payload
+
+    def json(self) -> Dict:
+        return self._payload
+
+
+class StubApi:
+    """模拟的 Gaea API，按虚拟秒记录请求数和每个账号的ping时间"""
+
+    def __init__(self, clock: VirtualClock, duration: int, ping_interval: float,
+                 latency: float = 0.0, error_rate: float = 0.0, seed: int = 0):
+        self.clock = clock
+        self.start = clock.time()
+        self.ping_interval = ping_interval
+        self.latency = latency
+        self.error_rate = error_rate
+        self.rng = random.Random(seed)
+        self.pings = array('I', [0]) * duration
+        self.infos = array('I', [0]) * duration
+        # uid -> [上次ping时间, 间隔数, 漂移总和, 最大漂移]
+        self.drift: Dict[str, List[float]] = {}
+
+    def _count(self, counts: array):
+        # 单步内的请求耗时可能使时间超出模拟范围，超出部分不计
+        second = int(self.clock.time() - self.start)
+        if second < len(counts):
+            counts[second] += 1
+
+    def _respond(self, data: Dict) -> StubResponse:
+        if self.latency:
+            self.clock.sleep(self.rng.uniform(0.5, 1.5) * self.latency)
+        if self.error_rate and self.rng.random() < self.error_rate:
+            return StubResponse(500, {})
+        return StubResponse(200, {"success": True, "data": data})
+
+    def post(self, url, headers=None, json=None, proxies=None, timeout=None) -> StubResponse:
+        now = self.clock.time()
+        self._count(self.pings)
+        uid = json.get('uid') if json else None
+        entry = self.drift.get(uid)
+        if entry is None:
+            self.drift[uid] = [now, 0, 0.0, 0.0]
+        else:
+            drift = now - entry[0] - self.ping_interval
+            entry[0] = now
+            entry[1] += 1
+            entry[2] += drift
+            if abs(drift) > abs(entry[3]):
+                entry[3] = drift
+        return self._respond({})
+
+    def get(self, url, headers=None, proxies=None, timeout=None) -> StubResponse:
+        self._count(self.infos)
+        return self._respond({"soul": 0, "core": 0, "uptime": 0})
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * pct / 100), len(ordered) - 1)]
+
+
+def max_window(counts: array, window: int) -> Tuple[int, int]:
+    """滑动窗口内请求数的最大值及窗口起点"""
+    total = sum(counts[:window])
+    best, best_start = total, 0
+    for i in range(window, len(counts)):
+        total += counts[i] - counts[i - window]
+        if total > best:
+            best, best_start = total, i - window + 1
+    return best, best_start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="挖矿调度模拟")
+    parser.add_argument('--accounts', type=int, default=10000, help="账号数")
+    parser.add_argument('--hours', type=float, default=24, help="模拟时长（小时）")
+    parser.add_argument('--latency', type=float, default=0.0, help="模拟的平均请求耗时（秒）")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="模拟的请求失败比例（只影响账号状态和信息更新，不改变ping调度）")
+    parser.add_argument('--ping-interval', type=float, default=None, help="覆盖 ping_interval")
+    parser.add_argument('--info-interval', type=float, default=None, help="覆盖 info_interval")
+    parser.add_argument('--seed', type=int, default=0, help="随机种子")
+    parser.add_argument('--csv', help="输出每秒请求数到CSV文件")
+    parser.add_argument('--drift-csv', help="输出每个账号的ping间隔漂移到CSV文件")
+    args = parser.parse_args()
+
+    # 模拟期间不输出每次请求的成功/失败日志
+    logging.getLogger('miningService').setLevel(logging.ERROR)
+    random.seed(args.seed)
+
+    duration = int(args.hours * 3600)
+    clock = VirtualClock(start=1_700_000_000)
+    service = MiningService(clock=clock, history_dir=None)
+    if args.ping_interval:
+        service.ping_interval = args.ping_interval
+    if args.info_interval:
+        service.info_interval = args.info_interval
+    stub = StubApi(clock, duration, service.ping_interval, args.latency, args.error_rate, args.seed)
+    service.http = stub
+
+    service.sync_accounts_from_database({
+        "id": f"account_{i}",
+        "name": f"账号{i}",
+        "uid": str(i),
+        "browser_id": f"browser_{i}",
+        "token": f"token_{i}"
+    } for i in range(args.accounts))
+    service.start_all_accounts()
+
+    begin = time.perf_counter()
+    clock.run_for(duration)
+    elapsed = time.perf_counter() - begin
+
+    totals = array('I', (p + i for p, i in zip(stub.pings, stub.infos)))
+    busy = [count for count in totals if count]
+    peak = max(totals) if totals else 0
+    peak_second = totals.index(peak) if peak else 0
+    burst_10s, burst_10s_start = max_window(totals, 10)
+    burst_60s, burst_60s_start = max_window(totals, 60)
+
+    print(f"模拟 {args.accounts} 个账号 {args.hours:g} 小时，耗时 {elapsed:.2f}s，执行 {clock.steps} 步")
+    print(f"请求总数: ping {sum(stub.pings)}，info {sum(stub.infos)}")
+    print(f"平均请求速率: {sum(totals) / max(duration, 1):.2f}/s（有请求的秒数 {len(busy)}/{duration}）")
+    print(f"每秒请求数: p50 {percentile(busy, 50):.0f}，p99 {percentile(busy, 99):.0f}，"
+          f"峰值 {peak}（第 {peak_second} 秒，ping {stub.pings[peak_second]} / info {stub.infos[peak_second]}）")
+    print(f"突发峰值: 10秒内 {burst_10s}（第 {burst_10s_start} 秒起），60秒内 {burst_60s}（第 {burst_60s_start} 秒起）")
+
+    entries = [entry for entry in stub.drift.values() if entry[1]]
+    mean_drifts = [entry[2] / entry[1] for entry in entries]
+    max_drifts = [abs(entry[3]) for entry in entries]
+    print(f"ping间隔漂移（相对 {service.ping_interval:g}s，{len(entries)} 个账号）: "
+          f"平均 p50 {percentile(mean_drifts, 50):.3f}s / p99 {percentile(mean_drifts, 99):.3f}s，"
+          f"单次最大 p99 {percentile(max_drifts, 99):.3f}s / 最大 {max(max_drifts, default=0.0):.3f}s")
+
+    if args.csv:
+        with open(args.csv, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['second', 'ping', 'info', 'total'])
+            for second in range(duration):
+                writer.writerow([second, stub.pings[second], stub.infos[second], totals[second]])
+        print(f"每秒请求数已写入 {args.csv}")
+
+    if args.drift_csv:
+        account_ids = {account.uid: account.id for account in service.accounts.values()}
+        rows = sorted(stub.drift.items(), key=lambda item: abs(item[1][3]), reverse=True)
+        with open(args.drift_csv, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['account', 'intervals', 'mean_drift', 'max_drift'])
+            for uid, (_, intervals, total, largest) in rows:
+                mean = total / intervals if intervals else 0.0
+                writer.writerow([account_ids.get(uid, uid), int(intervals), f"{mean:.3f}", f"{largest:.3f}"])
+        print(f"每个账号的ping间隔漂移已写入 {args.drift_csv}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+收益历史存储测试
+运行: python3 -m pytest test_earningsHistory.py
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import earningsHistory
+from earningsHistory import DAY, FLEET_STEP, EarningsHistory
+
+# 起点取在4周窗口中间，使数据跨越日/周/4周窗口边界
+START = 20000 * DAY + 10 * DAY
+
+
+def fill(history: EarningsHistory, days: int, accounts: int = 3, per_day: int = 48):
+    """每天写入 per_day 个采样并落盘一次，模拟服务运行 days 天"""
+    step = DAY // per_day
+    for day in range(days):
+        for i in range(per_day):
+            ts = START + day * DAY + i * step
+            for a in range(accounts):
+                history.append(f"acc{a}", {"soul": ts, "core": a}, ts)
+        history.flush(now=START + (day + 1) * DAY)
+
+
+def test_round_trip(tmp_path):
+    history = EarningsHistory(str(tmp_path))
+    history.append("acc0", {"soul": "1.5", "core": 2, "nested": {"x": 3}, "name": "n", "ok": True}, START)
+    history.append("acc0", {"soul": 2.5}, START + 60)
+
+    result = history.query("acc0", start=START, end=START + 60)
+    assert result["fields"] == ["core", "nested.x", "soul"]
+    assert result["timestamps"] == [START, START + 60]
+    assert result["values"]["soul"] == [1.5, 2.5]
+    assert result["values"]["core"] == [2.0, None]
+
+    history.flush(now=START)
+    history.close()
+
+    reopened = EarningsHistory(str(tmp_path))
+    assert reopened.query("acc0", start=START, end=START + 60) == result
+    assert reopened.query("unknown")["timestamps"] == []
+    reopened.close()
+
+
+def test_compaction_across_window_boundaries(tmp_path):
+    history = EarningsHistory(str(tmp_path))
+    days = 70
+    fill(history, days)
+
+    # 段头部的时间范围必须覆盖段内所有数据
+    for seg in history.segments:
+        assert seg.start_ts + max(seg.timestamps) < seg.end_ts
+
+    # 每一天在任何层级下都至少保留一个采样
+    for day in range(days):
+        day_start = START + day * DAY
+        result = history.query("acc0", start=day_start, end=day_start + DAY - 1)
+        assert result["timestamps"], f"第 {day} 天的数据无法查询"
+
+    full = history.query("acc0", start=START, end=START + days * DAY)
+    assert full["timestamps"] == sorted(full["timestamps"])
+    assert len(full["timestamps"]) == len(set(full["timestamps"]))
+
+    # 最近一天仍为30分钟精度，全网汇总覆盖所有账号
+    last_day = START + (days - 1) * DAY
+    assert len(history.query("acc0", start=last_day, end=last_day + DAY - 1)["timestamps"]) == 48
+    fleet = history.query(None, start=last_day, end=last_day + DAY - 1)
+    assert fleet["accounts"] and set(fleet["accounts"]) == {3}
+    history.close()
+
+
+def test_crash_during_flush_does_not_duplicate(tmp_path, monkeypatch):
+    history = EarningsHistory(str(tmp_path))
+    for i in range(4):
+        history.append("acc0", {"soul": i}, START + i * 1800)
+
+    # 段已写出，但在删除轮转的预写日志前崩溃
+    real_remove = os.remove
+
+    def crash(path):
+        if path.endswith('.flushing'):
+            raise RuntimeError("crash")
+        real_remove(path)
+
+    monkeypatch.setattr(earningsHistory.os, 'remove', crash)
+    with pytest.raises(RuntimeError):
+        history.flush(compact=False)
+    monkeypatch.setattr(earningsHistory.os, 'remove', real_remove)
+    history.close()
+
+    reopened = EarningsHistory(str(tmp_path))
+    result = reopened.query("acc0", start=START, end=START + DAY)
+    assert result["timestamps"] == [START + i * 1800 for i in range(4)]
+
+    reopened.flush(compact=False)
+    reopened.close()
+    again = EarningsHistory(str(tmp_path))
+    assert again.query("acc0", start=START, end=START + DAY) == result
+    again.close()
+
+
+def expected_fleet(samples, start, end):
+    """每个账号在每小时内最后一个采样之和"""
+    latest = {}
+    for account_id, ts, value in samples:
+        if start <= ts < end:
+            key = (ts // FLEET_STEP * FLEET_STEP, account_id)
+            if key not in latest or latest[key][0] <= ts:
+                latest[key] = (ts, value)
+    totals = {}
+    for (bucket, _), (_, value) in latest.items():
+        count, total = totals.get(bucket, (0, 0.0))
+        totals[bucket] = (count + 1, total + value)
+    return [(bucket, *totals[bucket]) for bucket in sorted(totals)]
+
+
+def fleet_of(history, start, end):
+    result = history.query(None, start=start, end=end - 1, fields=["soul"])
+    return list(zip(result["timestamps"], result["accounts"], result["values"]["soul"]))
+
+
+def test_fleet_over_raw_segments(tmp_path):
+    history = EarningsHistory(str(tmp_path))
+    samples = []
+    # 每15分钟一轮、每30分钟落盘一次，汇总桶跨越多个原始段；部分账号只在部分时段有数据
+    for i in range(40):
+        ts = START + i * 900
+        for a in range(5):
+            if (a + i) % 4:
+                samples.append((f"acc{a}", ts, float(a * 1000 + i)))
+                history.append(f"acc{a}", {"soul": a * 1000 + i}, ts)
+        if i % 2:
+            history.flush(compact=False)
+    end = START + 40 * 900
+
+    expected = expected_fleet(samples, START, end)
+    assert fleet_of(history, START, end) == expected
+    # 原始段中已封存的桶带有预计算的全网汇总
+    assert any(seg.is_raw and len(seg.fleet_timestamps) for seg in history.segments)
+    history.close()
+
+    reopened = EarningsHistory(str(tmp_path))
+    assert fleet_of(reopened, START, end) == expected
+    reopened.compact(now=START + 2 * DAY)
+    assert not any(seg.is_raw for seg in reopened.segments)
+    assert fleet_of(reopened, START, end) == expected
+    reopened.close()
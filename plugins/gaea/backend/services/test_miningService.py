@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+账号同步测试
+运行: python3 -m pytest test_miningService.py
+"""
+
+import gzip
+import io
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from miningClock import VirtualClock
+from miningService import MiningService, validate_account_record
+from ndjsonStream import iter_ndjson
+
+
+def account(i: int) -> dict:
+    return {"id": f"acc{i}", "name": f"账号{i}", "uid": str(i), "browser_id": f"browser_{i}", "token": f"token_{i}"}
+
+
+def make_service(count: int = 3) -> MiningService:
+    service = MiningService(clock=VirtualClock(start=1_700_000_000), history_dir=None)
+    assert service.sync_accounts_from_database([account(i) for i in range(count)]) == count
+    service.start_account("acc0")
+    return service
+
+
+def assert_unchanged(service: MiningService, count: int = 3):
+    assert set(service.accounts) == {f"acc{i}" for i in range(count)}
+    assert service.running_accounts == {"acc0"}
+    assert service.accounts["acc0"].status == "running"
+    assert service.get_sync_progress()["state"] == "failed"
+
+
+def test_validate_account_record():
+    assert validate_account_record(account(1)) is None
+    assert validate_account_record(ValueError("JSON解析失败")) == "JSON解析失败"
+    assert validate_account_record([1, 2]) == "记录不是JSON对象"
+    assert "token" in validate_account_record({"id": "a", "name": "n", "uid": "1"})
+    assert validate_account_record({**account(1), "id": ""}) == "账号ID无效"
+    assert validate_account_record({**account(1), "id": 5}) == "账号ID无效"
+
+
+def test_sync_replaces_accounts_and_keeps_running():
+    service = make_service()
+    errors = []
+    records = [account(0), {"id": "bad"}, "not a dict", account(9)]
+    assert service.sync_accounts_from_database(records, errors) == 2
+
+    assert set(service.accounts) == {"acc0", "acc9"}
+    assert service.running_accounts == {"acc0"}
+    assert [error["index"] for error in errors] == [1, 2]
+    progress = service.get_sync_progress()
+    assert progress["state"] == "done"
+    assert (progress["processed"], progress["synced"], progress["errors"]) == (4, 2, 2)
+
+
+def test_sync_all_invalid_keeps_existing_accounts():
+    service = make_service()
+    errors = []
+    assert service.sync_accounts_from_database([{"id": "x"}, ValueError("bad")], errors) == 0
+    assert len(errors) == 2
+    assert_unchanged(service)
+
+
+def test_sync_empty_stream_keeps_existing_accounts():
+    service = make_service()
+    assert service.sync_accounts_from_database(iter_ndjson(io.BytesIO(b'')), allow_empty=False) == 0
+    assert_unchanged(service)
+
+
+def test_sync_empty_list_clears_accounts_by_default():
+    service = make_service()
+    assert service.sync_accounts_from_database([]) == 0
+    assert service.accounts == {}
+    assert service.get_sync_progress()["state"] == "done"
+
+
+def test_sync_truncated_gzip_keeps_existing_accounts():
+    service = make_service()
+    data = gzip.compress(b''.join(b'{"id": "new%d", "name": "n", "uid": "1", "token": "t"}\n' % i
+                                  for i in range(1000)))
+    stream = iter_ndjson(io.BytesIO(data[:len(data) // 2]), 'gzip')
+    assert service.sync_accounts_from_database(stream, allow_empty=False) == 0
+    assert_unchanged(service)
+
+
+def test_sync_multi_member_gzip():
+    service = make_service()
+    data = b''.join(gzip.compress(b''.join(
+        b'{"id": "new%d", "name": "n", "uid": "1", "token": "t"}\n' % (member * 5 + i) for i in range(5)))
+        for member in range(2))
+    assert service.sync_accounts_from_database(iter_ndjson(io.BytesIO(data), 'gzip'), allow_empty=False) == 10
+    assert len(service.accounts) == 10
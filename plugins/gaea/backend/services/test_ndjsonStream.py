@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+NDJSON 流式解析测试
+运行: python3 -m pytest test_ndjsonStream.py
+"""
+
+import gzip
+import io
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import ndjsonStream
+from ndjsonStream import iter_decompressed, iter_ndjson
+
+
+def records(start: int, count: int) -> bytes:
+    return b''.join(b'{"id": "acc%d"}\n' % i for i in range(start, start + count))
+
+
+def parse(data: bytes, encoding=None):
+    return list(iter_ndjson(io.BytesIO(data), encoding))
+
+
+def test_plain_lines():
+    result = parse(b'{"id": "a"}\n\n  \n{"id": "b"}\n{"id": "c"}')
+    assert result == [{"id": "a"}, {"id": "b"}, {"id": "c"}]
+
+
+def test_bad_json_does_not_stop_iteration():
+    result = parse(b'{"id": "a"}\n{"id": \n{"id": "b"}\n')
+    assert result[0] == {"id": "a"}
+    assert isinstance(result[1], ValueError)
+    assert result[2] == {"id": "b"}
+
+
+def test_overlong_lines(monkeypatch):
+    monkeypatch.setattr(ndjsonStream, 'MAX_LINE_BYTES', 100)
+    monkeypatch.setattr(ndjsonStream, 'CHUNK_SIZE', 64)
+    long_line = b'{"id": "' + b'x' * 300 + b'"}'
+    data = b'{"id": "a"}\n' + long_line + b'\n{"id": "b"}\n' + long_line
+    result = parse(data)
+    assert result[0] == {"id": "a"}
+    assert isinstance(result[1], ValueError)
+    assert result[2] == {"id": "b"}
+    assert isinstance(result[3], ValueError)
+    assert len(result) == 4
+
+
+def test_overlong_line_within_single_chunk(monkeypatch):
+    monkeypatch.setattr(ndjsonStream, 'MAX_LINE_BYTES', 100)
+    result = parse(b'{"id": "' + b'x' * 300 + b'"}\n{"id": "b"}\n')
+    assert isinstance(result[0], ValueError)
+    assert result[1] == {"id": "b"}
+
+
+def test_gzip():
+    assert len(parse(gzip.compress(records(0, 1000)), 'gzip')) == 1000
+
+
+def test_multi_member_gzip():
+    data = gzip.compress(records(0, 5)) + gzip.compress(records(5, 5))
+    result = parse(data, 'gzip')
+    assert [record["id"] for record in result] == [f"acc{i}" for i in range(10)]
+
+
+def test_multi_member_gzip_across_chunks(monkeypatch):
+    monkeypatch.setattr(ndjsonStream, 'CHUNK_SIZE', 7)
+    data = b''.join(gzip.compress(records(i * 3, 3)) for i in range(4))
+    assert len(parse(data, 'gzip')) == 12
+
+
+def test_truncated_gzip():
+    data = gzip.compress(records(0, 100))
+    with pytest.raises(ValueError):
+        parse(data[:len(data) // 2], 'gzip')
+    with pytest.raises(ValueError):
+        parse(data[:-4], 'gzip')
+
+
+def test_trailing_garbage_after_gzip():
+    with pytest.raises(ValueError):
+        parse(gzip.compress(records(0, 5)) + b'garbage', 'gzip')
+
+
+def test_empty_gzip_body():
+    with pytest.raises(ValueError):
+        parse(b'', 'gzip')
+
+
+def test_unsupported_encoding():
+    with pytest.raises(ValueError):
+        list(iter_decompressed(io.BytesIO(b''), 'br'))
+
+
+def test_zstd_frames():
+    zstandard = pytest.importorskip("zstandard")
+    compressor = zstandard.ZstdCompressor()
+    data = compressor.compress(records(0, 5)) + compressor.compress(records(5, 5))
+    assert len(parse(data, 'zstd')) == 10
+
+    with pytest.raises(ValueError):
+        parse(data[:-3], 'zstd')
+    with pytest.raises(ValueError):
+        parse(data + b'garbage!', 'zstd')
@@ -1,29 +1,44 @@
 import { NextRequest, NextResponse } from 'next/server';
 
+// 与Python服务的 NDJSON_MIMETYPES 保持一致
+const NDJSON_MIMETYPES = ['application/x-ndjson', 'application/ndjson', 'application/jsonl'];
+
 export async function POST(request: NextRequest) {
   try {
-    const body = await request.json();
-    
+    const contentType = request.headers.get('content-type') || 'application/json';
+    const contentEncoding = request.headers.get('content-encoding');
+    const mimetype = contentType.split(';')[0].trim().toLowerCase();
+    const isNdjson = NDJSON_MIMETYPES.includes(mimetype);
+
+    const headers: Record<string, string> = {
+      'Content-Type': isNdjson ? contentType : 'application/json',
+    };
+    if (isNdjson && contentEncoding) {
+      headers['Content-Encoding'] = contentEncoding;
+    }
+
+    // NDJSON请求体原样流式转发给Python服务，不在此处解析
     const response = await fetch('http://localhost:5001/api/mining/sync-accounts', {
       method: 'POST',
-      headers: {
-        'Content-Type': 'application/json',
-      },
-      body: JSON.stringify(body),
-    });
+      headers,
+      body: isNdjson ? request.body : JSON.stringify(await request.json()),
+      ...(isNdjson ? { duplex: 'half' } : {}),
+    } as RequestInit);
+
+    const data = await response.json();
 
-    if (!response.ok) {
+    if (!response.ok && !data.error) {
       throw new Error(`Python服务响应错误: ${response.status}`);
     }
 
-    const data = await response.json();
-    
     return NextResponse.json({
       success: data.success,
       message: data.message,
       count: data.count,
+      progress: data.progress,
+      errors: data.errors,
       error: data.error
-    });
+    }, { status: response.ok ? 200 : response.status });
   } catch (error) {
     console.error('同步挖矿账号失败:', error);
     return NextResponse.json(
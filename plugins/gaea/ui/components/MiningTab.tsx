@@ -160,17 +160,26 @@ export function MiningTab({ onRefresh, loading: externalLoading, toast }: Mining
       
       // 同步账号数据到Python服务
       try {
+        // 以NDJSON发送（支持时gzip压缩），Python服务逐行流式处理
+        const ndjson = new Blob(accountList.map(account => JSON.stringify(account) + '\n'));
+        const canCompress = typeof CompressionStream !== 'undefined';
         const syncResponse = await fetch('/api/plugin/gaea/mining/sync-accounts', {
           method: 'POST',
           headers: {
-            'Content-Type': 'application/json',
+            'Content-Type': 'application/x-ndjson',
+            ...(canCompress ? { 'Content-Encoding': 'gzip' } : {}),
           },
-          body: JSON.stringify({ accounts: accountList }),
+          body: canCompress
+            ? await new Response(ndjson.stream().pipeThrough(new CompressionStream('gzip'))).blob()
+            : ndjson,
         });
         
         if (syncResponse.ok) {
           const syncData = await syncResponse.json();
           console.log('✅ 同步账号数据到Python服务:', syncData.message);
+          if (syncData.errors?.length) {
+            console.warn('⚠️ 部分账号同步失败:', syncData.errors);
+          }
         } else {
           console.warn('⚠️ 同步账号数据到Python服务失败');
         }